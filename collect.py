@@ -1,42 +1,50 @@
 import csv
+import os
 import sys
+import time
 import argparse
 import datetime
-from subprocess import check_output
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import PIPE, CalledProcessError, Popen
 
 
 class Commit:
+    __slots__ = ('repository', 'sha', 'timestamp', 'author', 'author_key', 'added', 'removed')
+
     @staticmethod
     def from_csv_file(filename: str) -> list['Commit']:
         """Load commits from a CSV file."""
         commits = []
-        with open(filename, 'r') as f:
+        with open(filename, 'r', newline='') as f:
             csv_reader = csv.reader(f)
             next(csv_reader)  # Skip header
-            for row in csv_reader:
-                repository, sha, timestamp, author, added, removed = row
-                dt = datetime.datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                added = int(added)
-                removed = int(removed)
-                commits.append(Commit(repository=repository, sha=sha, timestamp=dt, author=author, commits=1, added=added, removed=removed))
+            for repository, sha, timestamp, author, added, removed in csv_reader:
+                # repositories and authors repeat on almost every row, share one string per name
+                repository = sys.intern(repository)
+                author = sys.intern(author)
+                # '%Y-%m-%d %H:%M:%S' in local time, as written by to_csv_row
+                ts = int(datetime.datetime.fromisoformat(timestamp).timestamp())
+                commits.append(Commit(repository=repository, sha=sha, timestamp=ts, author=author, commits=1, added=int(added), removed=int(removed)))
         return commits
 
-    def __init__(self, repository: str, sha: str, timestamp: datetime.datetime, author: str, commits: int, added: int = -1, removed: int = -1):
+    def __init__(self, repository: str, sha: str, timestamp: int, author: str, commits: int, added: int = -1, removed: int = -1):
         self.repository = repository
         self.sha = sha
         self.timestamp = timestamp
         self.author = author
+        # normalized author used for filtering
+        self.author_key = author.strip().lower()
         self.added = added
         self.removed = removed
 
     def __repr__(self):
-        return f"Commit(sha={self.sha}, timestamp={self.timestamp}, author={self.author}, commits={self.commits}, added={self.added}, removed={self.removed})"
+        return f"Commit(sha={self.sha}, timestamp={self.timestamp}, author={self.author}, added={self.added}, removed={self.removed})"
 
     def to_csv_row(self):
         return [
             self.repository,
             self.sha,
-            self.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.timestamp)),
             self.author,
             self.added,
             self.removed
@@ -48,56 +56,63 @@ class Commit:
 
 
 
-def get_commits(repository_path: str):
+def iter_fields(stream, sep: bytes = b"\0", chunk_size: int = 1 << 16):
+    """Yield the sep-terminated fields of a binary stream while it is being read."""
+    rest = b""
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        *fields, rest = (rest + chunk).split(sep)
+        yield from fields
+    if rest:
+        yield rest
+
+
+def get_commits(repository_path: str) -> list[Commit]:
     repo = repository_path.split("/")[-1]
     sys.stdout.write(f"collecting the commits of {repo}\n")
-    
-    args = ["git", "-C", repository_path, "log", "--no-merges", "--pretty=format:%H|%at|%an", "--reverse"]
-    # git log --pretty=format:"%H|%at|%an" --reverse
-    # output format:
-    # c6370125df4e999f365eda516831465eede59396|1636063992|danielmoessner
 
+    args = ["git", "-C", repository_path, "log", "--no-merges", "-z", "--numstat", "--pretty=format:%H%x00%at%x00%an%x00", "--reverse"]
+    # git log --no-merges -z --numstat --pretty=format:"%H%x00%at%x00%an%x00" --reverse
+    # output format, all fields are terminated by NUL:
+    # c6370125df4e999f365eda516831465eede59396 1636063992 danielmoessner
+    # \n12\t3\tcollect.py   (the first numstat field starts with a newline)
+    # -\t-\timage.png       (binary files are reported as "-")
+    # 4\t4\t old.py new.py  (renames have an empty path followed by both paths)
+    # <empty field>         (end of the commit)
     items = []
-    for o in check_output(args, universal_newlines=True, shell=False).split("\n"):
-        c = o.split("|")
-        sha = c[0]
-        dt = datetime.datetime.fromtimestamp(int(c[1]))
-        author = c[2]
-        items.append(Commit(repository=repo, sha=sha, timestamp=dt, author=author, commits=1, added=-1, removed=-1))
-
-    return items
-
-
-def add_line_stats(items: list[Commit], repository: str) -> list[Commit]:
-    def get_added_removed(item: Commit, repository: str) -> Commit:
-        args = ["git", "-C", repository, "show", "--numstat", item.sha]
-        output = check_output(args, universal_newlines=True, shell=False)
-
-        added = 0
-        removed = 0
-        for line in output.split("\n"):
-            if line.strip() == "":
-                continue
-            parts = line.split("\t")
-            if len(parts) == 3:
-                added += int(parts[0]) if parts[0] != "-" else 0
-                removed += int(parts[1]) if parts[1] != "-" else 0
-
-        return added, removed
-
-    repo = repository.split("/")[-1]
-    sys.stdout.write(f"adding line stats for {len(items)} commits in {repo}\n")
-    for item in items:
-        item.update(*get_added_removed(item, repository))
+    # every author is decoded once and then shared by all of their commits
+    authors: dict[bytes, str] = {}
+    with Popen(args, stdout=PIPE, shell=False) as proc:
+        fields = iter_fields(proc.stdout)
+        for sha in fields:
+            timestamp = next(fields)
+            author = next(fields)
+            added = 0
+            removed = 0
+            for field in fields:
+                if not field:
+                    break
+                a, r, path = field.lstrip(b"\n").split(b"\t", 2)
+                added += int(a) if a != b"-" else 0
+                removed += int(r) if r != b"-" else 0
+                if not path:
+                    next(fields)
+                    next(fields)
+            name = authors.get(author)
+            if name is None:
+                name = authors[author] = author.decode("utf-8", "replace")
+            items.append(Commit(repository=repo, sha=sha.decode(), timestamp=int(timestamp), author=name, commits=1, added=added, removed=removed))
+    if proc.returncode:
+        raise CalledProcessError(proc.returncode, args)
+
+    sys.stdout.write(f"added line stats for {len(items)} commits in {repo}\n")
     return items
 
 
 def save_commits(commits: list[Commit], filename: str):
-    with open(filename, 'w') as f:
+    with open(filename, 'w', newline='') as f:
         csv_writer = csv.writer(f)
         csv_writer.writerow(['Repository', 'SHA', 'Timestamp', 'Author', 'Added', 'Removed'])
-        for commit in commits:
-            csv_writer.writerow(commit.to_csv_row())
+        csv_writer.writerows(commit.to_csv_row() for commit in commits)
 
 
 def main():
@@ -106,10 +121,10 @@ def main():
     p.add_argument("-o", "--output", dest="output", action="store", type=str, default="commits.csv", help="output csv file name")
     args = p.parse_args()
     commits = []
-    for r in args.repositories:
-        rcommits = get_commits(r)
-        add_line_stats(rcommits, r)
-        commits.extend(rcommits)
+    # every repository is read by its own git process, so collect them concurrently
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for rcommits in executor.map(get_commits, args.repositories):
+            commits.extend(rcommits)
     save_commits(commits, args.output)
 
 
@@ -1,26 +1,32 @@
+import math
 import statistics
 import sys
+import time
 import argparse
 import datetime
-from collections import OrderedDict
-from functional import list_filter, list_map, list_reduce
+from functools import cached_property
+from collections import Counter, OrderedDict
 from collect import Commit
 
 
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
 class Group:
     def __init__(self, name: str, commits: list[Commit]):
         self.name = name
         self.commits = commits
 
-    @property
+    # groups are filled after construction, so the sums are cached on first access
+    @cached_property
     def added(self):
         return sum(item.added for item in self.commits)
-    
-    @property
+
+    @cached_property
     def removed(self):
         return sum(item.removed for item in self.commits)
-    
-    @property
+
+    @cached_property
     def change(self):
         return self.added + self.removed
     
@@ -43,19 +49,19 @@ class Day:
         min_date = min(days.keys())
         max_date = max(days.keys())
         
+        filled: OrderedDict[datetime.date, Day] = OrderedDict()
         current_date = min_date
         while current_date <= max_date:
-            if current_date not in days:
-                days[current_date] = Day(current_date, [])
+            filled[current_date] = days[current_date] if current_date in days else Day(current_date, [])
             current_date += datetime.timedelta(days=1)
-        
-        return days
+
+        return filled
 
     @staticmethod
     def from_commits(commits: list[Commit]) -> OrderedDict[datetime.date, 'Day']:
         days: OrderedDict[datetime.date, Day] = OrderedDict()
         for commit in commits:
-            date = commit.timestamp.date()
+            date = datetime.date.fromtimestamp(commit.timestamp)
             if date not in days:
                 days[date] = Day(date, [])
             days[date].commits.append(commit)
@@ -73,6 +79,29 @@ class Day:
         return f"Day(date={self.date}, commits={list(map(lambda x: x.sha, self.commits))}, score={self.score})"
 
 
+class Analysis:
+    """Aggregations of a list of commits, each computed at most once."""
+
+    def __init__(self, commits: list[Commit]):
+        self.commits = commits
+
+    @cached_property
+    def authors(self) -> OrderedDict[str, int]:
+        return get_authors(self.commits)
+
+    @cached_property
+    def weeks(self) -> dict[int, Group]:
+        return group_by_week(self.commits)
+
+    @cached_property
+    def stats(self) -> tuple[float, float, float, float]:
+        return get_stats(self.weeks)
+
+    @cached_property
+    def repos(self) -> list[str]:
+        return get_repos(self.commits)
+
+
 def normalize(x, xmin, xmax):
     """Normalize a number to a 0-1 range given a min and max of its set."""
     return float(x - xmin) / float(xmax - xmin)
@@ -83,22 +112,21 @@ def normalize(x, xmin, xmax):
 
 def fill_dates(data):
     """Fill missing dates where there were no commits."""
-    n = len(data)
-    i = 0
-    while i < n - 1:
-        cur = data[i].timestamp
-        if (data[i+1].timestamp - cur).days > 1:
-            data.insert(i+1, Commit(
-                timestamp=cur + datetime.timedelta(days=1),
-                is_weekend=cur.weekday() > 4
-            ))
-            n += 1
-        i += 1
+    if not data:
+        return
+    filled = [data[0]]
+    for item in data[1:]:
+        cur = filled[-1].timestamp
+        while item.timestamp - cur >= 2 * SECONDS_PER_DAY:
+            cur += SECONDS_PER_DAY
+            filled.append(Commit(repository=item.repository, sha="", timestamp=cur, author="", commits=0, added=0, removed=0))
+        filled.append(item)
+    data[:] = filled
 
 
 def print_items(items: list[Commit]):
     for i in items:
-        print(f"{i.timestamp.strftime('%Y-%m-%d %a')} {i.author} added {i.added} and removed {i.removed}")
+        print(f"{time.strftime('%Y-%m-%d %a', time.localtime(i.timestamp))} {i.author} added {i.added} and removed {i.removed}")
 
 
 def calculate_scores(items: OrderedDict[datetime.date, Day]):
@@ -114,59 +142,52 @@ def calculate_scores(items: OrderedDict[datetime.date, Day]):
 
 
 
-def build_bars(groups: dict[str, Group], stddev_range: tuple[float, float, float], block=u"\u2580", width=50) -> list[str]:
+def build_bars(groups: dict[int, Group], stddev_range: tuple[float, float, float], block=u"\u2580", width=50) -> list[str]:
     bars = []
     _, lower, upper, _ = stddev_range
-    for name in sorted(groups.keys()):
+    blocks = [block * w for w in range(width + 1)]
+    for name in sorted(groups):
         group = groups[name]
-        bar = ""
-        bar += (group.name)
-        bar += " "
-        bar += ((6 - len(str(group.change))) * " ")
-        bar += (str(group.change))
-        bar += " "
-        bar += (block * int(group.get_score(lower, upper) * width))
-        bar += ("\n")
-        bars.append(bar)
+        bars.append(f"{group.name} {group.change:>6} {blocks[int(group.get_score(lower, upper) * width)]}\n")
     return bars
 
 
 def filter_by_authors(commits: list[Commit], authors: list[str]) -> list[Commit]:
-    _authors = list_map(authors, lambda a: a.strip().lower())
-    filtered_commits = list_filter(commits, lambda x: x.author.strip().lower() in _authors)
+    _authors = {a.strip().lower() for a in authors}
+    filtered_commits = [c for c in commits if c.author_key in _authors]
     sys.stdout.write(f"\n=> filtered down from {len(commits)} to {len(filtered_commits)} commits\n")
     return filtered_commits
 
 
 def get_authors(commits: list[Commit]):
-    def update(authors: dict[str, int], commit: Commit) -> dict[str, int]:
-        authors.setdefault(commit.author, 0)
-        authors[commit.author] += 1
-        return authors
-    authors = list_reduce(commits, update, {})
-    authors_ordered = OrderedDict(sorted(authors.items(), key=lambda x: x[1], reverse=True))
+    authors = Counter(commit.author for commit in commits)
+    authors_ordered = OrderedDict(authors.most_common())
     return authors_ordered
 
 
-def group_by_week(commits: list[Commit]) -> dict[str, Group]:
-    def update(groups: dict[str, Group], commit: Commit) -> dict[str, Group]:
-        week = commit.timestamp.strftime("%Y-%W")
-        if week not in groups:
-            groups[week] = Group(week, [])
-        groups[week].commits.append(commit)
-        return groups
-    groups = list_reduce(commits, update, {})
+def group_by_week(commits: list[Commit]) -> dict[int, Group]:
+    groups: dict[int, Group] = {}
+    for commit in commits:
+        # year * 100 + "%W" week number, so the keys sort like the "%Y-%W" names
+        t = time.localtime(commit.timestamp)
+        week = t.tm_year * 100 + (t.tm_yday + 6 - t.tm_wday) // 7
+        group = groups.get(week)
+        if group is None:
+            group = groups[week] = Group(f"{week // 100}-{week % 100:02d}", [])
+        group.commits.append(commit)
     sys.stdout.write(f"\n=> grouped into {len(groups)} weeks\n")
     return groups
 
 
-def get_stats(groups: dict[str, Group]) -> tuple[float, float, float]:
-    changes = list_map(groups.values(), lambda g: g.change)
+def get_stats(groups: dict[int, Group]) -> tuple[float, float, float, float]:
+    changes = [g.change for g in groups.values()]
     if not changes:
-        return None, None, None
+        return None, None, None, None
     median = round(statistics.median(changes))
-    avg = round(statistics.mean(changes))
-    stddev = round(statistics.stdev(changes)) if len(changes) > 1 else 0
+    # fmean and a float variance avoid the exact fraction arithmetic of mean/stdev
+    mean = statistics.fmean(changes)
+    avg = round(mean)
+    stddev = round(math.sqrt(sum((c - mean) ** 2 for c in changes) / (len(changes) - 1))) if len(changes) > 1 else 0
     lower = max(round(avg - stddev), 0)
     upper = round(avg + stddev)
     sys.stdout.write(f"\n=> calculated the stddev\n")
@@ -200,21 +221,17 @@ def main():
     p.add_argument("-o", "--output", dest="output", action="store", type=str, default="bars.txt",)
     args = p.parse_args()
 
-    commits = Commit.from_csv_file(args.file)
+    analysis = Analysis(Commit.from_csv_file(args.file))
 
-    authors = get_authors(commits)
+    authors = analysis.authors
     sys.stdout.write(f"=> found {len(authors)} authors\n")
     for author, count in authors.items():
         sys.stdout.write(f"{author}: {count}\n")
 
-    commits = filter_by_authors(commits, args.authors)
+    analysis = Analysis(filter_by_authors(analysis.commits, args.authors))
 
-    weeks = group_by_week(commits)
-    stats = get_stats(weeks)
-    repos = get_repos(commits)
-    
-    bars = build_bars(weeks, stats)
-    write_results_to_file(bars, stats, args.authors, repos, args.output)
+    bars = build_bars(analysis.weeks, analysis.stats)
+    write_results_to_file(bars, analysis.stats, args.authors, analysis.repos, args.output)
 
 
 if __name__ == "__main__":